@@ -1,160 +1,677 @@
 from argparse import ArgumentParser, Namespace
-import requests
-from dns import resolver
+import httpx
+from dns import asyncquery, asyncresolver, flags, message, rcode, rdatatype, resolver
+from dns.exception import DNSException
+import dns.name
 from rich.console import Console
 from rich.table import Table
+import asyncio
+import atexit
 import ipaddress
+import json
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+# query() is deprecated, only aiodns releases with query_dns() (4.0+) are used
+if aiodns is not None and not hasattr(aiodns.DNSResolver, "query_dns"):
+    aiodns = None
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 BGPVIEW = "https://api.bgpview.io"
 
+# Precompiled classifiers for --bgp values
+_ASN_RE = re.compile(r'\A\d+\Z')
+_IP_RE = re.compile(r'\A[0-9a-fA-F:.]+(?:/\d+)?\Z')
+
+BASE_RDTYPES = ['A', 'AAAA', 'CNAME', 'MX', 'NS', 'SOA', 'PTR', 'SRV', 'TXT', 'CAA']
+# Only queried when the zone publishes a DNSKEY
+DNSSEC_RDTYPES = ['DS', 'DNSKEY', 'RRSIG', 'NSEC', 'NSEC3', 'NSEC3PARAM']
+
+# Record types c-ares can query; anything else (DNSSEC types) goes through dnspython
+AIODNS_RDTYPES = {'A', 'AAAA', 'CNAME', 'MX', 'NS', 'SOA', 'PTR', 'SRV', 'TXT', 'CAA'}
+# c-ares errors carry no SOA, so negative aiodns answers are cached for a fixed time
+AIODNS_NEGATIVE_TTL = 300
+# How long to remember that a nameserver refuses ANY queries, or gives an unusable answer for a name
+ANY_REFUSED_TTL = 3600
+
+STATUS_OK = "✓"
+# Rows answered from the disk cache rather than the network
+STATUS_CACHED = "✓ (cached)"
+CACHED_CAPTION = "Served from the local cache, run with --no-cache to refresh"
+
+# Tables with more rows than this are rendered without row separators
+LARGE_TABLE_ROWS = 500
+
+# Rich only skips probing the terminal on every print when both the width and height are fixed
+_TERMINAL_SIZE = shutil.get_terminal_size((120, 20))
+CONSOLE = Console(width=_TERMINAL_SIZE.columns, height=_TERMINAL_SIZE.lines)
+
+# Persistent cache of DNS answers and BGPView responses, shared between runs
+# Opened lazily by _get_cache() so importing the module or running --help never touches the disk
+CACHE_DIR = os.path.expanduser("~/.cache/network_tool")
+CACHE = None
+_cache_unavailable = diskcache is None
+# BGP data changes slowly, so BGPView responses are kept for an hour
+BGPVIEW_CACHE_TTL = 3600
+# Stale BGPView bodies are kept this long for conditional revalidation before being dropped
+BGPVIEW_REVALIDATE_TTL = 7 * 24 * 3600
+
+# Each bgp() call shares one HTTP/2 client so BGPView calls are multiplexed over one TCP/TLS connection
+BGPVIEW_HEADERS = {"Accept": "application/json", "Accept-Encoding": "gzip", "User-Agent": "network_tool/1.0"}
+BGPVIEW_LIMITS = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+# Retry policy for BGPView requests, mirroring urllib3's Retry(total=3, backoff_factor=0.3)
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Like urllib3, the server's Retry-After header takes precedence over the backoff for these
+RETRY_AFTER_STATUSES = {413, 429, 503}
+# Longer Retry-After waits are reported as the error instead of hanging the CLI
+RETRY_AFTER_MAX = 10
+
 def main(args: Namespace):
     if args.fqdn is None and args.nameserver is None and args.subnet is None and args.target_host is None \
             and args.bgp is None:
         print("No arguments provided. Use --help for more information.")
         return
+    if args.no_cache:
+        global _cache_unavailable
+        _cache_unavailable = True
     if args.fqdn and args.nameserver is not None:
-        fqdn(args.fqdn[0], args.nameserver[0])
+        fqdn(args.fqdn[0], args.nameserver[0], args.resolver, not args.no_dnssec)
     elif args.fqdn:
-        fqdn(args.fqdn[0])
+        fqdn(args.fqdn[0], resolver_backend=args.resolver, dnssec=not args.no_dnssec)
     elif args.bgp:
         bgp(args.bgp)
 
 
 def bgp(bgp: Namespace):
-    asn = None
-    console = Console()
+    asyncio.run(bgp_async(bgp))
+
+
+async def bgp_async(bgp: Namespace):
+    try:
+        kind, value = _classify(str(bgp))
+    except ValueError:
+        print(f"The value passed to --bgp is invalid: {str(bgp)}.")
+        print(f"Make sure the value passed is a valid ASN number of a valid IP Address/Subnet")
+        return
     try:
-        if bgp.isdigit():
-            '''Treat BGP as an ASN'''
-            asn = int(str(bgp))
-            console.print(f"[bold]BGP ASN:[/bold] {asn}")
-            # Perform BGP lookup using the ASN
-            try:
-                response = requests.get(f"{BGPVIEW}/asn/{asn}/prefixes")
-                if response.status_code == 200:
-                    data = response.json()
-                    asn_info = data.get('data', {})
+        # The transport retries failed connects, _get_with_retry covers retryable status codes
+        transport = httpx.AsyncHTTPTransport(http2=True, limits=BGPVIEW_LIMITS, retries=RETRY_TOTAL)
+        async with httpx.AsyncClient(transport=transport, timeout=5.0, headers=BGPVIEW_HEADERS) as c:
+            if kind == "asn":
+                '''Treat BGP as an ASN'''
+                asn = value
+                CONSOLE.print(f"[bold]BGP ASN:[/bold] {asn}")
+                from_cache = set()
+                # Perform BGP lookup using the ASN, fetching every endpoint concurrently. Each endpoint backs
+                # its own table, so one failing endpoint only loses that table
+                results = await asyncio.gather(
+                    _fetch(c, f"/asn/{asn}", from_cache),
+                    _fetch(c, f"/asn/{asn}/prefixes", from_cache),
+                    _fetch(c, f"/asn/{asn}/peers", from_cache),
+                    _fetch(c, f"/asn/{asn}/upstreams", from_cache),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, BaseException) and not isinstance(result, httpx.HTTPError):
+                        raise result
+                info_data, prefixes_data, peers_data, upstreams_data = results
+
+                if isinstance(info_data, httpx.HTTPError):
+                    _print_error(f"ASN {asn} details", info_data)
+                else:
+                    info = info_data.get('data', {})
+                    info_table = Table(title=f"ASN {asn} Details", show_lines=True)
+                    info_table.add_column("ASN", style="cyan", no_wrap=True, overflow="fold")
+                    info_table.add_column("Name", style="green", overflow="fold")
+                    info_table.add_column("Description", style="magenta", overflow="fold")
+                    info_table.add_column("Country Code", style="yellow", no_wrap=True, overflow="fold")
+                    info_table.add_column("RIR", style="green", overflow="fold")
+                    info_table.add_column("Website", style="blue", overflow="fold")
+                    info_table.add_row(
+                        str(info.get('asn', asn)),
+                        info.get('name') or "UNKNOWN",
+                        info.get('description_short') or "UNKNOWN",
+                        info.get('country_code') or "UNKNOWN",
+                        (info.get('rir_allocation') or {}).get('rir_name') or "UNKNOWN",
+                        info.get('website') or ""
+                    )
+                    _print_table(info_table, f"/asn/{asn}" in from_cache)
+
+                if isinstance(prefixes_data, httpx.HTTPError):
+                    _print_error(f"ASN {asn} prefixes", prefixes_data)
+                else:
+                    asn_info = prefixes_data.get('data', {})
                     prefixes = asn_info.get('ipv4_prefixes', [])
                     table = Table(title=f"ASN {asn} Information", show_lines=True)
-                    table.add_column("Name", style="cyan")
-                    table.add_column("Prefix", style="green")
-                    table.add_column("CIDR", style="magenta")
-                    table.add_column("Status", style="yellow")
+                    table.add_column("Name", style="cyan", overflow="fold")
+                    table.add_column("Prefix", style="green", overflow="fold")
+                    table.add_column("CIDR", style="magenta", no_wrap=True, overflow="fold")
+                    table.add_column("Status", style="yellow", no_wrap=True, overflow="fold")
+                    add_row = table.add_row
                     for prefix in prefixes:
-                        table.add_row(
+                        add_row(
                             prefix['name'],
                             prefix['prefix'],
                             str(prefix['cidr']),
-                            "✓"
+                            STATUS_OK
                         )
-                    console.print(table, new_line_start=True)
-            except requests.exceptions.RequestException as e:
-                console.print(f"[bold red]Error:[/bold red] {e}")
-                return
-        elif get_ip_or_none(str(bgp)):
-            prefix = ipaddress.ip_network(str(bgp))
-            try:
-                response = requests.get(f"{BGPVIEW}/prefix/{prefix}")
-                if response.status_code == 200:
-                    data = response.json()
-                    prefix_info = data.get('data', {})
-                    prefix_table = Table(title=f"Prefix {prefix} Information", show_lines=True)
-                    prefix_table.add_column("Name", style="cyan")
-                    prefix_table.add_column("Prefix", style="green")
-                    prefix_table.add_column("IP", style="blue")
-                    prefix_table.add_column("Description", style="magenta")
-                    prefix_table.add_column("ASN Count", style="blue_violet")
-                    prefix_table.add_column("Status", style="yellow")
-                    prefix_table.add_row(
-                        prefix_info['name'],
-                        prefix_info['prefix'],
-                        prefix_info['ip'],
-                        prefix_info['description_short'] if prefix_info['description_short'] else "UNKNOWN",
-                        str(len(prefix_info['asns'])),
-                        "✓"
+                    _print_table(table, f"/asn/{asn}/prefixes" in from_cache)
+
+                if isinstance(peers_data, httpx.HTTPError):
+                    _print_error(f"ASN {asn} peers", peers_data)
+                else:
+                    _print_table(_asn_list_table(f"ASN {asn} Peers", peers_data.get('data', {}).get('ipv4_peers', [])),
+                                 f"/asn/{asn}/peers" in from_cache)
+
+                if isinstance(upstreams_data, httpx.HTTPError):
+                    _print_error(f"ASN {asn} upstreams", upstreams_data)
+                else:
+                    _print_table(_asn_list_table(f"ASN {asn} Upstreams",
+                                                 upstreams_data.get('data', {}).get('ipv4_upstreams', [])),
+                                 f"/asn/{asn}/upstreams" in from_cache)
+            elif kind == "net":
+                prefix = value
+                from_cache = set()
+                data = await _fetch(c, f"/prefix/{prefix}", from_cache)
+                prefix_info = data.get('data', {})
+                prefix_table = Table(title=f"Prefix {prefix} Information", show_lines=True)
+                prefix_table.add_column("Name", style="cyan", overflow="fold")
+                prefix_table.add_column("Prefix", style="green", overflow="fold")
+                prefix_table.add_column("IP", style="blue", overflow="fold")
+                prefix_table.add_column("Description", style="magenta", overflow="fold")
+                prefix_table.add_column("ASN Count", style="blue_violet", no_wrap=True, overflow="fold")
+                prefix_table.add_column("Status", style="yellow", no_wrap=True, overflow="fold")
+                prefix_table.add_row(
+                    prefix_info['name'],
+                    prefix_info['prefix'],
+                    prefix_info['ip'],
+                    prefix_info['description_short'] if prefix_info['description_short'] else "UNKNOWN",
+                    str(len(prefix_info['asns'])),
+                    STATUS_OK
+                )
+                asn_count = len(prefix_info['asns'])
+                # Enrich each origin ASN with its detail record, fetched concurrently. The detail is optional,
+                # so a failed lookup only leaves that ASN's RIR as UNKNOWN
+                details = await asyncio.gather(*[_fetch(c, f"/asn/{a['asn']}", from_cache) for a in prefix_info['asns']],
+                                               return_exceptions=True)
+                for d in details:
+                    if isinstance(d, BaseException) and not isinstance(d, httpx.HTTPError):
+                        raise d
+                asn_details = [{} if isinstance(d, httpx.HTTPError) else d.get('data', {}) for d in details]
+                rows = [
+                    (
+                        str(a['asn']),
+                        a['name'],
+                        a['description'],
+                        a['country_code'],
+                        (d.get('rir_allocation') or {}).get('rir_name') or "UNKNOWN",
+                        str(u['asn']),
+                        u['name']
                     )
-                    asn_count = len(prefix_info['asns'])
-                    asn_table = Table(title=f"ASN Information for {prefix}", show_lines=True)
-                    asn_table.add_column("ASN", style="cyan")
-                    asn_table.add_column("Name", style="green")
-                    asn_table.add_column("Description", style="magenta")
-                    asn_table.add_column("Country Code", style="yellow")
-                    asn_table.add_column("Upstream ASNs", style="blue")
-                    asn_table.add_column("Upstream ASN Names", style="cyan")
-                    for asn in prefix_info['asns']:
-                        for upstream_asn in asn['prefix_upstreams']:
-                            asn_table.add_row(
-                                str(asn['asn']),
-                                asn['name'],
-                                asn['description'],
-                                asn['country_code'],
-                                str(upstream_asn['asn']),
-                                upstream_asn['name']
-                            )
-
-                    console.print(prefix_table, new_line_start=True)
-                    console.print(asn_table, new_line_start=True)
-            except requests.exceptions.RequestException as e:
-                console.print(f"[bold red]Error:[/bold red] {e}")
-                return
+                    for a, d in zip(prefix_info['asns'], asn_details)
+                    for u in a['prefix_upstreams']
+                ]
+                # Row separators are the most expensive part of rendering very large tables
+                asn_table = Table(title=f"ASN Information for {prefix}",
+                                  show_lines=len(rows) <= LARGE_TABLE_ROWS)
+                asn_table.add_column("ASN", style="cyan", no_wrap=True, overflow="fold")
+                asn_table.add_column("Name", style="green", overflow="fold")
+                asn_table.add_column("Description", style="magenta", overflow="fold")
+                asn_table.add_column("Country Code", style="yellow", no_wrap=True, overflow="fold")
+                asn_table.add_column("RIR", style="green", overflow="fold")
+                asn_table.add_column("Upstream ASNs", style="blue", no_wrap=True, overflow="fold")
+                asn_table.add_column("Upstream ASN Names", style="cyan", overflow="fold")
+                add_row = asn_table.add_row
+                for r in rows:
+                    add_row(*r)
 
+                _print_table(prefix_table, f"/prefix/{prefix}" in from_cache)
+                _print_table(asn_table, any(f"/asn/{a['asn']}" in from_cache for a in prefix_info['asns']))
+    except httpx.HTTPError as e:
+        # Transient failures have already been retried by the time they get here
+        CONSOLE.print(f"[bold red]Error:[/bold red] {e}")
+        return
+
+
+def _print_error(what: str, e: Exception):
+    CONSOLE.print(f"[bold red]Error:[/bold red] Unable to retrieve {what}: {e}")
+
+
+def _print_table(table: Table, from_cache: bool = False):
+    '''Print a table, Rich renders the whole table and flushes it in a single write per call'''
+    if from_cache:
+        table.caption = CACHED_CAPTION
+    CONSOLE.print(table, new_line_start=True)
+
+
+def _asn_list_table(title: str, entries: list) -> Table:
+    '''Build a table for a BGPView list of neighbouring ASNs (peers or upstreams)'''
+    table = Table(title=title, show_lines=len(entries) <= LARGE_TABLE_ROWS)
+    table.add_column("ASN", style="cyan", no_wrap=True, overflow="fold")
+    table.add_column("Name", style="green", overflow="fold")
+    table.add_column("Description", style="magenta", overflow="fold")
+    table.add_column("Country Code", style="yellow", no_wrap=True, overflow="fold")
+    add_row = table.add_row
+    for entry in entries:
+        add_row(
+            str(entry['asn']),
+            entry['name'] or "UNKNOWN",
+            entry['description'] or "UNKNOWN",
+            entry['country_code'] or "UNKNOWN"
+        )
+    return table
+
+
+def _get_cache():
+    '''Open the disk cache on first use, returning None if diskcache is missing or the directory is unusable'''
+    global CACHE, _cache_unavailable
+    if CACHE is None and not _cache_unavailable:
+        try:
+            CACHE = diskcache.Cache(CACHE_DIR)
+        except (OSError, sqlite3.Error):
+            _cache_unavailable = True
         else:
-            print(f"Error: Unable to retrieve BGP information for ASN {asn}.")
-    except ValueError:
-        print(f"The value passed to --bgp is invalid: {str(bgp)}.")
-        print(f"Make sure the value passed is a valid ASN number of a valid IP Address/Subnet")
+            atexit.register(CACHE.close)
+    return CACHE
+
+
+def _cache_get(key: tuple):
+    cache = _get_cache()
+    if cache is None:
+        return None
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    expiry, value = entry
+    return value if expiry > time.time() else None
+
+
+def _cache_set(key: tuple, value, ttl: float):
+    cache = _get_cache()
+    if cache is None or ttl <= 0:
         return
+    cache.set(key, (time.time() + ttl, value), expire=ttl)
+
+
+def _retry_after(r: httpx.Response) -> Optional[float]:
+    '''Seconds to wait from a Retry-After header, given either as seconds or as an HTTP date'''
+    value = r.headers.get("Retry-After")
+    if r.status_code not in RETRY_AFTER_STATUSES or value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _get_with_retry(c: httpx.AsyncClient, url: str, headers: dict) -> httpx.Response:
+    '''GET a URL, backing off and retrying on rate limiting and transient server errors'''
+    for attempt in range(RETRY_TOTAL + 1):
+        r = await c.get(url, headers=headers)
+        if r.status_code not in RETRY_STATUSES or attempt == RETRY_TOTAL:
+            return r
+        delay = _retry_after(r)
+        if delay is not None and delay > RETRY_AFTER_MAX:
+            return r
+        await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt) if delay is None else delay)
+
+
+async def _fetch(c: httpx.AsyncClient, path: str, from_cache: Optional[set] = None) -> dict:
+    '''GET a BGPView path, adding it to from_cache when the answer is served from disk unchecked'''
+    url = BGPVIEW + path
+    # The body and its validators live in one entry, a separate short-lived marker says it is still fresh
+    key = ("bgpview", url)
+    fresh_key = ("bgpview-fresh", url)
+    cache = _get_cache()
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and _cache_get(fresh_key) is not None:
+        if from_cache is not None:
+            from_cache.add(path)
+        return entry[2]
+    # Once the cached copy goes stale, revalidate it with a conditional GET instead of downloading it again
+    headers = {}
+    if entry is not None:
+        etag, last_modified, _ = entry
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    r = await _get_with_retry(c, url, headers)
+    if r.status_code == 304 and entry is not None:
+        data = entry[2]
+        cache.touch(key, expire=BGPVIEW_REVALIDATE_TTL)
+    else:
+        r.raise_for_status()
+        try:
+            data = _loads(r.content)
+        except ValueError as e:
+            # A non-JSON body (an HTML error page, say) is a failed request, not an invalid --bgp value
+            raise httpx.DecodingError(f"Invalid JSON from {url}: {e}", request=r.request) from e
+        if cache is not None:
+            # Overwriting the entry also drops validators the server no longer sends
+            cache.set(key, (r.headers.get("ETag"), r.headers.get("Last-Modified"), data),
+                      expire=BGPVIEW_REVALIDATE_TTL)
+    _cache_set(fresh_key, time.time(), BGPVIEW_CACHE_TTL)
+    return data
+
 
+@lru_cache(maxsize=4096)
+def _classify(s: str) -> tuple:
+    '''Classify a --bgp value as ("asn", int) or ("net", ip_network), raising ValueError otherwise'''
+    if _ASN_RE.match(s):
+        return "asn", int(s)
+    prefix = get_ip_or_none(s) if _IP_RE.match(s) else None
+    if prefix is None:
+        raise ValueError(s)
+    return "net", prefix
 
+
+@lru_cache(maxsize=4096)
 def get_ip_or_none(ip_str):
+    # Validate the address part with inet_pton (C) before handing off to ipaddress for the prefix
+    host, _, _ = ip_str.partition('/')
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+        except (OSError, ValueError):
+            continue
+        try:
+            return ipaddress.ip_network(ip_str, strict=False)
+        except ValueError:
+            return None
+    return None
+
+
+def fqdn(_fqdn: str, nameserver: str = None, resolver_backend: str = "dnspython", dnssec: bool = True):
+    if resolver_backend == "aiodns" and aiodns is None:
+        print("aiodns 4.0 or newer is not installed, falling back to dnspython.")
+        resolver_backend = "dnspython"
+    if resolver_backend == "aiodns" and sys.platform == "win32":
+        # aiodns needs a selector based event loop on Windows
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(_fqdn_async(_fqdn, nameserver, resolver_backend, dnssec))
+
+
+def _absolute(name: str) -> str:
+    return name if name.endswith('.') else name + '.'
+
+
+def _format_aiodns(rdtype: str, records: list) -> list:
+    '''Render aiodns DNSRecords in the same presentation format dnspython uses'''
+    data = [r.data for r in records]
+    if rdtype in ('A', 'AAAA'):
+        return [d.addr for d in data]
+    if rdtype == 'NS':
+        return [_absolute(d.nsdname) for d in data]
+    if rdtype == 'CNAME':
+        return [_absolute(d.cname) for d in data]
+    if rdtype == 'PTR':
+        return [_absolute(d.dname) for d in data]
+    if rdtype == 'MX':
+        return [f"{d.priority} {_absolute(d.exchange)}" for d in data]
+    if rdtype == 'SRV':
+        return [f"{d.priority} {d.weight} {d.port} {_absolute(d.target)}" for d in data]
+    if rdtype == 'SOA':
+        return [f"{_absolute(d.mname)} {_absolute(d.rname)} {d.serial} {d.refresh} {d.retry} {d.expire} {d.minimum}"
+                for d in data]
+    if rdtype == 'TXT':
+        return [f'"{d.data.decode() if isinstance(d.data, bytes) else d.data}"' for d in data]
+    if rdtype == 'CAA':
+        return [f'{d.critical} {d.tag} "{d.value}"' for d in data]
+    raise NotImplementedError(rdtype)
+
+
+@lru_cache(maxsize=32)
+def _resolver_for(nameserver: Optional[str]) -> asyncresolver.Resolver:
+    '''Build a resolver once per nameserver, only reading /etc/resolv.conf for the system resolver'''
+    if nameserver:
+        r = asyncresolver.Resolver(configure=False)
+        r.nameservers = [nameserver]
+        return r
+    return asyncresolver.Resolver()
+
+
+def _negative_ttl(response) -> float:
+    '''Negative caching TTL for a NODATA/NXDOMAIN response (RFC 2308), 0 if it has no SOA'''
+    for rrset in response.authority if response is not None else []:
+        if rrset.rdtype == rdatatype.SOA:
+            return min(rrset.ttl, rrset[0].minimum)
+    return 0
+
+
+async def _resolve(r: asyncresolver.Resolver, name: str, rd: str) -> tuple:
+    '''Resolve with dnspython, returning (records, ttl, response) with NODATA/NXDOMAIN as no records'''
     try:
-        return ipaddress.ip_network(ip_str)
-    except ValueError:
+        answers = await r.resolve(name, rd, raise_on_no_answer=False)
+    except resolver.NXDOMAIN as e:
+        response = next(iter(e.responses().values()), None)
+        return [], _negative_ttl(response), response
+    if answers.rrset is None:
+        return [], _negative_ttl(answers.response), answers.response
+    return [str(rdata) for rdata in answers], answers.rrset.ttl, answers.response
+
+
+async def _query_any(r: asyncresolver.Resolver, source: str, _fqdn: str, from_cache: set):
+    '''Try to fetch every base record type with a single ANY query.
+
+    Returns (rdtype, records) pairs in BASE_RDTYPES order, or None when the per-type queries are
+    needed. Recursive resolvers answer ANY with whatever subset they have cached (RFC 8482), so only
+    an authoritative answer is trusted, and it must hold at least two types to be worth using.
+    '''
+    refused_key = (source, "ANY-REFUSED")
+    if _cache_get(refused_key) is not None:
         return None
+    key = (source, "dnspython", _fqdn, "ANY")
+    cached = _cache_get(key)
+    if cached is not None:
+        # A name whose ANY answer was unusable is cached as an empty list
+        from_cache.update(rd for rd, _ in cached)
+        return cached or None
+    response = await _send_any(r, _fqdn)
+    if response is None or response.rcode() not in (rcode.NOERROR, rcode.NXDOMAIN) \
+            or not response.flags & flags.AA:
+        _cache_set(refused_key, True, ANY_REFUSED_TTL)
+        return None
+    rrsets = [rrset for rrset in response.answer if rdatatype.to_text(rrset.rdtype) in BASE_RDTYPES]
+    if len({rrset.rdtype for rrset in rrsets}) < 2:
+        _cache_set(key, [], ANY_REFUSED_TTL)
+        return None
+    rrsets.sort(key=lambda rrset: BASE_RDTYPES.index(rdatatype.to_text(rrset.rdtype)))
+    results = [(rdatatype.to_text(rrset.rdtype), [str(rdata) for rdata in rrset]) for rrset in rrsets]
+    _cache_set(key, results, min(rrset.ttl for rrset in rrsets))
+    return results
+
+
+async def _send_any(r: asyncresolver.Resolver, _fqdn: str):
+    if not r.nameservers:
+        return None
+    # Resolver.resolve() refuses metaqueries, so the ANY query is built and sent by hand
+    nameserver = r.nameservers[0]
+    query = message.make_query(_fqdn, 'ANY')
+    try:
+        response, _ = await asyncquery.udp_with_fallback(query, getattr(nameserver, 'address', nameserver),
+                                                         timeout=r.timeout, port=getattr(nameserver, 'port', r.port))
+    except (DNSException, OSError):
+        return None
+    return response
+
+
+def _remember_zone(source: str, _fqdn: str, response) -> Optional[str]:
+    '''Cache the zone apex named by an SOA owned by the name itself or one of its parents'''
+    if response is None:
+        return None
+    name = dns.name.from_text(_fqdn)
+    # Behind a CNAME the answer's SOA belongs to the target, which says nothing about this name's zone
+    has_cname = any(rrset.rdtype == rdatatype.CNAME for rrset in response.answer)
+    for rrset in response.authority if has_cname else response.answer + response.authority:
+        if rrset.rdtype == rdatatype.SOA and name.is_subdomain(rrset.name):
+            zone = rrset.name.to_text()
+            _cache_set((source, "dnspython", _fqdn, "ZONE"), zone, rrset.ttl)
+            return zone
+    return None
+
 
+async def _zone_of(r: asyncresolver.Resolver, source: str, _fqdn: str) -> str:
+    '''Find the zone apex for a name, reusing the zone seen by an earlier SOA query'''
+    zone = _cache_get((source, "dnspython", _fqdn, "ZONE"))
+    if zone is not None:
+        return zone
+    _, _, response = await _resolve(r, _fqdn, 'SOA')
+    zone = _remember_zone(source, _fqdn, response)
+    if zone is not None:
+        return zone
+    return (await asyncresolver.zone_for_name(_fqdn, resolver=r)).to_text()
 
-def fqdn(_fqdn: str, nameserver: str = None):
-    rdtypes = ['A', 'AAAA', 'CNAME', 'MX', 'NS', 'SOA', 'PTR', 'SRV', 'TXT', 'CAA', 'DS', 'DNSKEY', 'RRSIG', 'NSEC',
-               'NSEC3', 'NSEC3PARAM']
-    console = Console()
 
+async def _dnskey_probe(r: asyncresolver.Resolver, source: str, zone: str) -> tuple:
+    '''Fetch the DNSKEY records at a zone apex as (records, from_cache), no records means the zone is unsigned'''
+    key = (source, "dnspython", zone, "DNSKEY")
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached, True
+    try:
+        records, ttl, _ = await _resolve(r, zone, 'DNSKEY')
+    except DNSException:
+        return [], False
+    _cache_set(key, records, ttl)
+    return records, False
+
+
+async def _dnssec_results(r: asyncresolver.Resolver, source: str, _fqdn: str, base: dict, _one,
+                          from_cache: set) -> list:
+    '''Query the DNSSEC record types, but only when the zone is signed.
+
+    A name with an SOA and no CNAME is its own zone apex, so the base results usually locate
+    the zone without an extra lookup. The apex DNSKEY probe doubles as the DNSKEY row.
+    '''
+    is_apex = isinstance(base.get('SOA'), list) and bool(base['SOA']) and not base.get('CNAME')
+    try:
+        zone = _absolute(_fqdn) if is_apex else await _zone_of(r, source, _fqdn)
+    except DNSException:
+        return []
+    dnskey, dnskey_cached = await _dnskey_probe(r, source, zone)
+    if not dnskey:
+        return []
+    # DNSKEY only exists at the apex, where the probe already fetched it
+    others = dict(await asyncio.gather(*[_one(rd) for rd in DNSSEC_RDTYPES if rd != 'DNSKEY']))
+    if is_apex:
+        others['DNSKEY'] = dnskey
+        if dnskey_cached:
+            from_cache.add('DNSKEY')
+    return [(rd, others[rd]) for rd in DNSSEC_RDTYPES if rd in others]
+
+
+async def _fqdn_async(_fqdn: str, nameserver: str = None, resolver_backend: str = "dnspython", dnssec: bool = True):
     system_nameservers = []
     try:
         # Set up resolver
+        r = _resolver_for(nameserver)
         if nameserver:
-            console.print(f"[bold]FQDN:[/bold] {_fqdn}, [bold]Nameserver:[/bold] {nameserver}")
-            resolver.default_resolver = resolver.Resolver(configure=False)
-            resolver.default_resolver.nameservers = [nameserver]
+            CONSOLE.print(f"[bold]FQDN:[/bold] {_fqdn}, [bold]Nameserver:[/bold] {nameserver}")
         else:
-            resolver.default_resolver = resolver.Resolver()
-            system_nameservers = resolver.default_resolver.nameservers
-            console.print(
+            system_nameservers = r.nameservers
+            CONSOLE.print(
                 f"[bold]FQDN:[/bold] {_fqdn}, [bold]Nameserver:[/bold] {system_nameservers[0] if system_nameservers else 'unknown'}")
+        aio = None
+        if resolver_backend == "aiodns":
+            aio = aiodns.DNSResolver(nameservers=[nameserver] if nameserver else None)
 
         # Create a table
         table = Table(
             title=f"DNS Records for {_fqdn} using nameserver: {nameserver if nameserver else system_nameservers[0]}",
             show_lines=True)
-        table.add_column("Record Type", style="cyan")
-        table.add_column("Data", style="green")
-        table.add_column("Status", style="yellow")
-
-        # Collect DNS data
-        for rdtype in rdtypes:
-            try:
-                answers = resolver.resolve(_fqdn, rdtype)
-                for rdata in answers:
-                    table.add_row(rdtype, str(rdata), "✓")
-            except Exception as e:
-                error_msg = str(e)
+        table.add_column("Record Type", style="cyan", no_wrap=True, overflow="fold")
+        table.add_column("Data", style="green", overflow="fold")
+        table.add_column("Status", style="yellow", no_wrap=True, overflow="fold")
+
+        # Collect DNS data, trying a single ANY query before querying every record type concurrently
+        semaphore = asyncio.Semaphore(8)
+
+        source = nameserver or "system"
+        # Record types answered from the disk cache, flagged in the Status column
+        from_cache = set()
+
+        async def _one(rd):
+            use_aio = aio is not None and rd in AIODNS_RDTYPES
+            # The backend is part of the key so a table never mixes the two backends' formatting
+            key = (source, "aiodns" if use_aio else "dnspython", _fqdn, rd)
+            cached = _cache_get(key)
+            if cached is not None:
+                from_cache.add(rd)
+                return rd, cached
+            async with semaphore:
+                try:
+                    if use_aio:
+                        try:
+                            result = await aio.query_dns(_fqdn, rd)
+                        except aiodns.error.DNSError as e:
+                            if e.args[0] not in (aiodns.error.ARES_ENODATA, aiodns.error.ARES_ENOTFOUND):
+                                raise
+                            _cache_set(key, [], AIODNS_NEGATIVE_TTL)
+                            return rd, []
+                        answer = [x for x in result.answer if x.type == rdatatype.from_text(rd)]
+                        records = _format_aiodns(rd, answer)
+                        _cache_set(key, records, min((x.ttl for x in answer), default=0))
+                        return rd, records
+                    # Empty results (NODATA/NXDOMAIN) are cached too, for the zone's negative TTL
+                    records, ttl, response = await _resolve(r, _fqdn, rd)
+                    _cache_set(key, records, ttl)
+                    if rd == 'SOA':
+                        _remember_zone(source, _fqdn, response)
+                    return rd, records
+                except Exception as e:
+                    return rd, e
+
+        # ANY is only tried against a nameserver given with --nameserver, and never stands in for the
+        # DNSSEC types: it is sent without the DO bit and DS lives in the parent zone
+        results = await _query_any(r, source, _fqdn, from_cache) if nameserver and aio is None else None
+        if results is None:
+            results = list(await asyncio.gather(*[_one(rd) for rd in BASE_RDTYPES]))
+        if dnssec:
+            results += await _dnssec_results(r, source, _fqdn, dict(results), _one, from_cache)
+        add_row = table.add_row
+        for rdtype, answers in results:
+            if isinstance(answers, Exception):
+                error_msg = str(answers)
                 # Only add to table if it's not a "record not found" type error
                 if "NXDOMAIN" not in error_msg and "NODATA" not in error_msg:
-                    table.add_row(rdtype, "", f"Error: {error_msg}")
+                    add_row(rdtype, "", f"Error: {error_msg}")
+                continue
+            status = STATUS_CACHED if rdtype in from_cache else STATUS_OK
+            for rdata in answers:
+                add_row(rdtype, rdata, status)
 
         # Display the table
-        console.print(table, new_line_start=True)
+        _print_table(table, bool(from_cache))
     except Exception as e:
-        console.print(f"[bold red]Error:[/bold red] {e}")
+        CONSOLE.print(f"[bold red]Error:[/bold red] {e}")
         return
 
 
@@ -166,5 +683,11 @@ if __name__ == "__main__":
     parser.add_argument("--subnet", type=str, nargs=1, help='''Enter the IP/subnet address of the target host.''')
     parser.add_argument("--target-host", type=str, nargs=1, help='''Enter the target host to 
                         scan including the port number for example 10.0.0.1:80''')
+    parser.add_argument("--resolver", type=str, choices=["dnspython", "aiodns"], default="dnspython",
+                        help='''Select the DNS resolver backend used for --fqdn lookups.''')
+    parser.add_argument("--no-dnssec", action="store_true",
+                        help='''Skip DNSSEC record types (DS, DNSKEY, RRSIG, NSEC, NSEC3, NSEC3PARAM).''')
     parser.add_argument("--bgp", type=str, help='''Enter the subnet or ASN you wish to inspect.''')
+    parser.add_argument("--no-cache", action="store_true",
+                        help='''Ignore the local cache of DNS answers and BGPView responses and do not update it.''')
     main(parser.parse_args())
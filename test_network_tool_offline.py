@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+'''Offline checks for network_tool, no DNS server or BGPView access needed'''
+import argparse
+import asyncio
+import ipaddress
+
+import dns.name
+import httpx
+import pytest
+from dns import flags, message, rcode, rdataclass, rdatatype, resolver, rrset
+
+import network_tool
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    # Tests opt back in to the disk cache explicitly, with a temporary directory
+    monkeypatch.setattr(network_tool, "CACHE", None)
+    monkeypatch.setattr(network_tool, "_cache_unavailable", True)
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(network_tool, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(network_tool, "_cache_unavailable", False)
+    yield
+    if network_tool.CACHE is not None:
+        network_tool.CACHE.close()
+
+
+def test_classify_asn():
+    assert network_tool._classify("13335") == ("asn", 13335)
+
+
+def test_classify_prefix_allows_host_bits():
+    assert network_tool._classify("10.0.0.1/8") == ("net", ipaddress.ip_network("10.0.0.0/8"))
+
+
+@pytest.mark.parametrize("value", ["google.com", "1.2.3", "1.1.1.0/99", "13335\n", ""])
+def test_classify_invalid(value):
+    with pytest.raises(ValueError):
+        network_tool._classify(value)
+
+
+def test_get_ip_or_none():
+    assert network_tool.get_ip_or_none("1.1.1.1") == ipaddress.ip_network("1.1.1.1/32")
+    assert network_tool.get_ip_or_none("2606:4700::/32") == ipaddress.ip_network("2606:4700::/32")
+    assert network_tool.get_ip_or_none("1.1.1.0/99") is None
+    assert network_tool.get_ip_or_none("abc") is None
+
+
+def _record(pycares, data):
+    return pycares.DNSRecord(name="example.com", type=0, record_class=1, ttl=60, data=data)
+
+
+def test_format_aiodns_matches_dnspython():
+    pycares = pytest.importorskip("pycares")
+    assert network_tool._format_aiodns("MX", [_record(pycares, pycares.MXRecordData(10, "mx.example.com"))]) == \
+        ["10 mx.example.com."]
+    assert network_tool._format_aiodns("SOA", [_record(pycares, pycares.SOARecordData(
+        "ns1.example.com", "host.example.com", 1, 7200, 3600, 1209600, 60))]) == \
+        ["ns1.example.com. host.example.com. 1 7200 3600 1209600 60"]
+    assert network_tool._format_aiodns("TXT", [_record(pycares, pycares.TXTRecordData(b"v=spf1 -all"))]) == \
+        ['"v=spf1 -all"']
+
+
+def _get(handler, url="https://api.bgpview.io/asn/1", headers=None):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            return await network_tool._get_with_retry(c, url, headers or {})
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(network_tool.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def test_retry_backs_off_on_server_errors(sleeps):
+    statuses = iter([502, 503, 200])
+    r = _get(lambda request: httpx.Response(next(statuses)))
+    assert r.status_code == 200
+    assert sleeps == [network_tool.RETRY_BACKOFF, network_tool.RETRY_BACKOFF * 2]
+
+
+def test_retry_gives_up_after_total(sleeps):
+    r = _get(lambda request: httpx.Response(500))
+    assert r.status_code == 500
+    assert len(sleeps) == network_tool.RETRY_TOTAL
+
+
+def test_retry_honours_retry_after(sleeps):
+    responses = iter([httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200)])
+    assert _get(lambda request: next(responses)).status_code == 200
+    assert sleeps == [7.0]
+
+
+@pytest.mark.parametrize("retry_after", ["86400", "Wed, 21 Oct 2099 07:28:00 GMT"])
+def test_long_retry_after_gives_up(sleeps, retry_after):
+    r = _get(lambda request: httpx.Response(429, headers={"Retry-After": retry_after}))
+    assert r.status_code == 429
+    assert sleeps == []
+
+def test_fetch_revalidates_with_etag(disk_cache):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"data": {"asn": 1}}, headers={"ETag": '"v1"'})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            first = await network_tool._fetch(c, "/asn/1")
+            # Drop the freshness marker so the next fetch has to revalidate
+            network_tool._get_cache().delete(("bgpview-fresh", network_tool.BGPVIEW + "/asn/1"))
+            second = await network_tool._fetch(c, "/asn/1")
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"data": {"asn": 1}}
+    assert seen == [None, '"v1"']
+
+
+def _run_bgp(monkeypatch, handler, value):
+    monkeypatch.setattr(network_tool.httpx, "AsyncHTTPTransport", lambda **kwargs: httpx.MockTransport(handler))
+    asyncio.run(network_tool.bgp_async(value))
+
+
+PREFIX = {"data": {
+    "name": "EXAMPLE-NET", "prefix": "192.0.2.0/24", "ip": "192.0.2.0", "description_short": "Example",
+    "asns": [
+        {"asn": 64500, "name": "A", "description": "A Net", "country_code": "GB",
+         "prefix_upstreams": [{"asn": 64510, "name": "UP"}]},
+        {"asn": 64501, "name": "B", "description": "B Net", "country_code": "US",
+         "prefix_upstreams": [{"asn": 64510, "name": "UP"}]},
+    ],
+}}
+
+
+def test_prefix_keeps_report_when_asn_detail_fails(monkeypatch, capsys):
+    def handler(request):
+        if request.url.path == "/prefix/192.0.2.0/24":
+            return httpx.Response(200, json=PREFIX)
+        if request.url.path == "/asn/64500":
+            return httpx.Response(200, json={"data": {"rir_allocation": {"rir_name": "RIPE"}}})
+        return httpx.Response(404)
+
+    _run_bgp(monkeypatch, handler, "192.0.2.0/24")
+    out = capsys.readouterr().out
+    assert "Error" not in out
+    assert "RIPE" in out and "UNKNOWN" in out
+    assert "64501" in out
+
+
+@pytest.mark.parametrize("value", ["13335", "1.1.1.0/24"])
+def test_non_json_body_is_an_http_error(monkeypatch, capsys, value):
+    _run_bgp(monkeypatch, lambda request: httpx.Response(200, text="<html>maintenance</html>"), value)
+    out = capsys.readouterr().out
+    assert "invalid" not in out
+    assert "Invalid JSON" in out
+
+
+NAMESERVER = "192.0.2.53"
+ZONE = {
+    ("example.test.", "SOA"): ["ns1.example.test. host.example.test. 1 7200 3600 1209600 60"],
+    ("example.test.", "NS"): ["ns1.example.test."],
+    ("example.test.", "A"): ["192.0.2.1"],
+    ("example.test.", "MX"): ["10 mx.example.test."],
+    ("example.test.", "TXT"): ['"v=spf1 -all"'],
+    ("www.example.test.", "A"): ["192.0.2.2"],
+}
+SIGNED = {
+    ("example.test.", "DNSKEY"): ["257 3 13 mdsswUyr3DPW132mOi8V9xESWE8jTo0dxCjjnopKl+GqJxpVXckHAeF+KkxLbxIL"
+                                  "fDLUT0rAK9iUzy1L53eKGQ=="],
+    ("example.test.", "NSEC3PARAM"): ["1 0 0 -"],
+}
+
+
+class FakeNameserver:
+    '''Answers for a single zone from a dict of (name, rdtype) -> rdatas, recording every query'''
+
+    def __init__(self, records, authoritative=True, any_rcode=rcode.NOERROR):
+        self.records = records
+        self.authoritative = authoritative
+        self.any_rcode = any_rcode
+        self.queries = []
+
+    def _response(self, qname: dns.name.Name, rd: str):
+        response = message.make_response(message.make_query(qname, rd))
+        if self.authoritative:
+            response.flags |= flags.AA
+        if qname.to_text() not in {name for name, _ in self.records}:
+            response.set_rcode(rcode.NXDOMAIN)
+        for (name, rdtype), rdatas in self.records.items():
+            if name == qname.to_text() and rd in (rdtype, "ANY"):
+                response.find_rrset(response.answer, qname, rdataclass.IN, rdatatype.from_text(rdtype),
+                                    create=True).update(rrset.from_text_list(name, 300, "IN", rdtype, rdatas))
+        if not response.answer:
+            soa = rrset.from_text_list("example.test.", 300, "IN", "SOA", self.records[("example.test.", "SOA")])
+            response.find_rrset(response.authority, soa.name, rdataclass.IN, rdatatype.SOA,
+                                create=True).update(soa)
+        return response
+
+    async def resolve(self, qname, rdtype="A", raise_on_no_answer=True, **kwargs):
+        qname = dns.name.from_text(str(qname))
+        rd = rdatatype.to_text(rdatatype.RdataType.make(rdtype))
+        self.queries.append((qname.to_text(), rd))
+        response = self._response(qname, rd)
+        if response.rcode() == rcode.NXDOMAIN:
+            raise resolver.NXDOMAIN(qnames=[qname], responses={qname: response})
+        if not response.answer and raise_on_no_answer:
+            raise resolver.NoAnswer(response=response)
+        return resolver.Answer(qname, rdatatype.from_text(rd), rdataclass.IN, response)
+
+    async def udp_with_fallback(self, query, where, **kwargs):
+        qname = query.question[0].name
+        self.queries.append((qname.to_text(), "ANY"))
+        if self.any_rcode != rcode.NOERROR:
+            response = message.make_response(query)
+            response.set_rcode(self.any_rcode)
+            return response, False
+        return self._response(qname, "ANY"), False
+
+
+def _install(monkeypatch, fake: FakeNameserver) -> FakeNameserver:
+    monkeypatch.setattr(network_tool._resolver_for(NAMESERVER), "resolve", fake.resolve)
+    monkeypatch.setattr(network_tool.asyncquery, "udp_with_fallback", fake.udp_with_fallback)
+    return fake
+
+
+def _lookup(name: str, dnssec: bool = True):
+    asyncio.run(network_tool._fqdn_async(name, NAMESERVER, dnssec=dnssec))
+
+
+def test_authoritative_any_replaces_base_queries(monkeypatch, capsys):
+    fake = _install(monkeypatch, FakeNameserver({**ZONE, **SIGNED}))
+    _lookup("example.test")
+    out = capsys.readouterr().out
+    assert "Error" not in out
+    assert "10 mx.example.test." in out and "v=spf1 -all" in out
+    # DNSSEC types are still queried one by one, the apex DNSKEY probe doubling as the DNSKEY row
+    assert [rd for _, rd in fake.queries] == ["ANY", "DNSKEY", "DS", "RRSIG", "NSEC", "NSEC3", "NSEC3PARAM"]
+    assert "NSEC3PARAM" in out and "257 3 13" in out
+
+
+@pytest.mark.parametrize("fake", [FakeNameserver(ZONE, authoritative=False),
+                                  FakeNameserver(ZONE, any_rcode=rcode.REFUSED)])
+def test_any_falls_back_to_per_type_queries(monkeypatch, capsys, fake):
+    _install(monkeypatch, fake)
+    _lookup("example.test", dnssec=False)
+    out = capsys.readouterr().out
+    assert "10 mx.example.test." in out and "v=spf1 -all" in out
+    assert [rd for _, rd in fake.queries] == ["ANY"] + network_tool.BASE_RDTYPES
+
+
+def test_single_type_any_answer_falls_back(monkeypatch, capsys):
+    fake = _install(monkeypatch, FakeNameserver(ZONE))
+    _lookup("www.example.test", dnssec=False)
+    assert "192.0.2.2" in capsys.readouterr().out
+    assert [rd for _, rd in fake.queries] == ["ANY"] + network_tool.BASE_RDTYPES
+
+
+def test_any_refusal_is_remembered_per_nameserver(monkeypatch, disk_cache):
+    fake = _install(monkeypatch, FakeNameserver(ZONE, any_rcode=rcode.REFUSED))
+    _lookup("example.test", dnssec=False)
+    fake.queries.clear()
+    _lookup("www.example.test", dnssec=False)
+    assert "ANY" not in [rd for _, rd in fake.queries]
+
+
+def test_unsigned_zone_skips_dnssec_types(monkeypatch):
+    fake = _install(monkeypatch, FakeNameserver(ZONE, any_rcode=rcode.REFUSED))
+    _lookup("example.test")
+    assert fake.queries[len(network_tool.BASE_RDTYPES) + 1:] == [("example.test.", "DNSKEY")]
+
+
+def test_signed_apex_reuses_dnskey_probe(monkeypatch, capsys):
+    fake = _install(monkeypatch, FakeNameserver({**ZONE, **SIGNED}, any_rcode=rcode.REFUSED))
+    _lookup("example.test")
+    assert fake.queries.count(("example.test.", "DNSKEY")) == 1
+    assert "257 3 13" in capsys.readouterr().out
+
+
+def test_non_apex_probes_dnskey_at_the_zone_apex(monkeypatch, capsys, disk_cache):
+    fake = _install(monkeypatch, FakeNameserver({**ZONE, **SIGNED}, any_rcode=rcode.REFUSED))
+    _lookup("www.example.test")
+    # The zone comes from the authority section of the base SOA query, no second lookup is needed
+    assert fake.queries.count(("www.example.test.", "SOA")) == 1
+    assert ("example.test.", "DNSKEY") in fake.queries
+    assert ("www.example.test.", "DNSKEY") not in fake.queries
+    assert ("www.example.test.", "DS") in fake.queries
+    assert "257 3 13" not in capsys.readouterr().out
+
+
+def _soa(zone: str):
+    return rrset.from_text(zone, 300, "IN", "SOA", f"ns1.{zone} host.{zone} 1 7200 3600 1209600 60")
+
+
+def test_remember_zone_ignores_cname_target_soa(disk_cache):
+    response = message.make_response(message.make_query("www.example.test.", "SOA"))
+    response.answer.append(rrset.from_text("www.example.test.", 300, "IN", "CNAME", "edge.cdn.test."))
+    response.answer.append(_soa("cdn.test."))
+    assert network_tool._remember_zone(NAMESERVER, "www.example.test", response) is None
+    response.authority.append(_soa("example.test."))
+    assert network_tool._remember_zone(NAMESERVER, "www.example.test", response) == "example.test."
+
+
+def test_remember_zone_ignores_unrelated_authority_soa():
+    response = message.make_response(message.make_query("www.example.test.", "SOA"))
+    response.authority.append(_soa("other.test."))
+    assert network_tool._remember_zone(NAMESERVER, "www.example.test", response) is None
+
+
+def test_negative_answers_and_zone_are_cached(monkeypatch, disk_cache):
+    fake = _install(monkeypatch, FakeNameserver({**ZONE, **SIGNED}, any_rcode=rcode.REFUSED))
+    _lookup("www.example.test")
+    # NODATA is cached for min(SOA TTL, SOA minimum), per RFC 2308
+    expiry, records = network_tool._get_cache().get((NAMESERVER, "dnspython", "www.example.test", "MX"))
+    assert records == []
+    assert expiry - network_tool.time.time() == pytest.approx(60, abs=5)
+    assert network_tool._cache_get((NAMESERVER, "dnspython", "www.example.test", "ZONE")) == "example.test."
+    fake.queries.clear()
+    _lookup("www.example.test")
+    assert fake.queries == []
+
+
+def test_cached_rows_are_marked(monkeypatch, capsys, disk_cache):
+    _install(monkeypatch, FakeNameserver({**ZONE, **SIGNED}, any_rcode=rcode.REFUSED))
+    _lookup("example.test")
+    first = capsys.readouterr().out
+    assert "cached" not in first
+    _lookup("example.test")
+    second = capsys.readouterr().out
+    assert network_tool.CACHED_CAPTION in " ".join(second.split())
+    assert second.count(network_tool.STATUS_CACHED) == first.count(network_tool.STATUS_OK)
+
+
+def _args(**kwargs):
+    defaults = dict(fqdn=None, nameserver=None, subnet=None, target_host=None, bgp=None, resolver="dnspython",
+                    no_dnssec=False, no_cache=False)
+    return argparse.Namespace(**{**defaults, **kwargs})
+
+
+def test_no_cache_skips_the_disk_cache(monkeypatch, capsys, disk_cache):
+    fake = _install(monkeypatch, FakeNameserver(ZONE, any_rcode=rcode.REFUSED))
+    for _ in range(2):
+        network_tool.main(_args(fqdn=["example.test"], nameserver=[NAMESERVER], no_dnssec=True, no_cache=True))
+    assert network_tool.CACHE is None
+    assert fake.queries.count(("example.test.", "MX")) == 2
+    assert "cached" not in capsys.readouterr().out
+
+
+def test_cached_bgpview_tables_have_a_caption(monkeypatch, capsys, disk_cache):
+    def handler(request):
+        return httpx.Response(200, json={"data": {"asn": 64500, "name": "EXAMPLE"}})
+
+    _run_bgp(monkeypatch, handler, "64500")
+    assert network_tool.CACHED_CAPTION not in capsys.readouterr().out
+    _run_bgp(monkeypatch, handler, "64500")
+    # Captions wrap to the table width
+    assert " ".join(capsys.readouterr().out.split()).count(network_tool.CACHED_CAPTION) == 4
+
+
+def test_asn_renders_the_tables_whose_endpoints_succeeded(monkeypatch, capsys, sleeps):
+    def handler(request):
+        if request.url.path == "/asn/64500/peers":
+            return httpx.Response(404)
+        if request.url.path == "/asn/64500/upstreams":
+            return httpx.Response(200, text="<html>maintenance</html>")
+        if request.url.path == "/asn/64500/prefixes":
+            return httpx.Response(200, json={"data": {"ipv4_prefixes": [
+                {"name": "EXAMPLE-NET", "prefix": "192.0.2.0/24", "cidr": 24}]}})
+        return httpx.Response(200, json={"data": {"asn": 64500, "name": "EXAMPLE"}})
+
+    _run_bgp(monkeypatch, handler, "64500")
+    out = capsys.readouterr().out
+    assert "ASN 64500 Details" in out and "ASN 64500 Information" in out and "EXAMPLE-NET" in out
+    assert "Unable to retrieve ASN 64500 peers" in out
+    assert "Unable to retrieve ASN 64500 upstreams" in out
+    assert "ASN 64500 Peers" not in out and "ASN 64500 Upstreams" not in out
+
+
+def test_console_does_not_probe_the_terminal(monkeypatch):
+    def probe(*args):
+        raise AssertionError("terminal size probed")
+
+    monkeypatch.setattr(network_tool.os, "get_terminal_size", probe)
+    assert network_tool.CONSOLE.size == (network_tool._TERMINAL_SIZE.columns, network_tool._TERMINAL_SIZE.lines)
+